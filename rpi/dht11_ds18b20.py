@@ -1,30 +1,58 @@
 #!/usr/bin/env python3
 
-import board
-import adafruit_dht
 import os
 import glob
 import time
 import json
 import traceback
 
+from history import HistoryStore
+
 # --- Sensor Configuration ---
 SENSOR_ID = "RPI_SENSOR_STATION"
 
 # DHT11 Configuration
-DHT_PIN = board.D4  # GPIO4, Physical pin 7
-DHT_SENSOR_TYPE = adafruit_dht.DHT11
+DHT_PIN = "D4"  # GPIO4, Physical pin 7 (a `board` pin name)
 
 # DS18B20 Configuration (One-Wire)
 ONE_WIRE_BASE_DIR = '/sys/bus/w1/devices/'
+# Resolution in bits (9-12). Lower resolution trades precision for speed:
+# 9 bits = 0.5°C steps in ~94 ms, 12 bits = 0.0625°C steps in ~750 ms.
+DS18B20_RESOLUTION = 12
+# Per-probe overrides, e.g. {'28-0123456789ab': 9}
+DS18B20_RESOLUTIONS = {}
+# Maximum conversion time (seconds) for each resolution, from the DS18B20 datasheet
+DS18B20_CONVERSION_TIMES = {9: 0.094, 10: 0.1875, 11: 0.375, 12: 0.75}
+# Pause before re-reading a probe after a CRC failure. Reading w1_slave
+# already waits for a full conversion in the kernel, so this stays short.
+DS18B20_RETRY_DELAY = 0.05
+
+# Seconds from the start of one reading cycle to the next
+READ_INTERVAL = 5.0
+
+# Resolution applied to each probe, filled in as probes are found
+ds18b20_resolutions = {}
+
+# DHT11 device, created by init_dht11() so that importing this module
+# does not claim the pin or need the Blinka libraries (the DS18B20
+# functions only read sysfs)
+dhtDevice = None
 
-# Initialize DHT11 device
-dhtDevice = adafruit_dht.DHT11(DHT_PIN)
+def init_dht11(pin=DHT_PIN):
+    """Initialize the DHT11 device on the given `board` pin name, e.g. 'D4'"""
+    import board
+    import adafruit_dht
 
-def find_ds18b20_sensors():
+    global dhtDevice
+    dhtDevice = adafruit_dht.DHT11(getattr(board, pin))
+    return dhtDevice
+
+def find_ds18b20_sensors(base_dir=None):
     """Find all connected DS18B20 sensors"""
+    if base_dir is None:
+        base_dir = ONE_WIRE_BASE_DIR
     try:
-        device_folders = glob.glob(ONE_WIRE_BASE_DIR + '28*')
+        device_folders = glob.glob(os.path.join(base_dir, '28*'))
         sensors = {}
         for folder in device_folders:
             sensor_id = os.path.basename(folder)
@@ -44,6 +72,65 @@ def read_ds18b20_raw(device_file):
         print(f"Error reading DS18B20 raw data: {e}")
         return None
 
+def set_ds18b20_resolution(device_file, resolution):
+    """Set the resolution (9-12 bits) of a DS18B20 sensor through sysfs"""
+    if resolution not in DS18B20_CONVERSION_TIMES:
+        print(f"Invalid DS18B20 resolution: {resolution} (must be 9-12 bits)")
+        return False
+
+    # Newer kernels expose a 'resolution' attribute; older w1_therm drivers
+    # accept the resolution written to w1_slave instead.
+    resolution_file = os.path.join(os.path.dirname(device_file), 'resolution')
+    if not os.path.exists(resolution_file):
+        resolution_file = device_file
+
+    try:
+        with open(resolution_file, 'w') as f:
+            f.write(str(resolution))
+        return True
+    except Exception as e:
+        print(f"Error setting DS18B20 resolution: {e}")
+        return False
+
+def get_ds18b20_resolution(device_file):
+    """Read the current resolution of a DS18B20 sensor"""
+    resolution_file = os.path.join(os.path.dirname(device_file), 'resolution')
+    try:
+        if os.path.exists(resolution_file):
+            with open(resolution_file, 'r') as f:
+                return int(f.read().strip())
+
+        # Fall back to the configuration register (5th scratchpad byte),
+        # e.g. "50 05 4b 46 7f ff 0c 10 1c : crc=1c YES"
+        lines = read_ds18b20_raw(device_file)
+        if lines:
+            config = int(lines[0].split()[4], 16)
+            return ((config >> 5) & 0x03) + 9
+    except Exception as e:
+        print(f"Error reading DS18B20 resolution: {e}")
+    return None
+
+def get_ds18b20_conversion_time(resolution):
+    """Return the expected conversion time (seconds) for a resolution"""
+    return DS18B20_CONVERSION_TIMES.get(resolution, DS18B20_CONVERSION_TIMES[12])
+
+def configure_ds18b20(sensor_id, device_file, resolution=None):
+    """Apply the configured resolution to a probe and return the one in effect"""
+    if resolution is None:
+        resolution = DS18B20_RESOLUTIONS.get(sensor_id, DS18B20_RESOLUTION)
+    if get_ds18b20_resolution(device_file) != resolution:
+        set_ds18b20_resolution(device_file, resolution)
+
+    applied = get_ds18b20_resolution(device_file)
+    # A failed read-back is not cached, so the probe is configured again next cycle
+    if applied is not None:
+        ds18b20_resolutions[sensor_id] = applied
+    return applied
+
+def get_ds18b20_read_time(resolutions):
+    """Expected time (seconds) to read probes with the given resolutions once each"""
+    return sum(get_ds18b20_conversion_time(resolution) for resolution in resolutions)
+
 def get_ds18b20_temperature(device_file):
     """Read temperature from specific DS18B20 sensor"""
     try:
@@ -54,7 +141,7 @@ def get_ds18b20_temperature(device_file):
         # Wait for valid data
         retries = 0
         while lines[0].strip()[-3:] != 'YES' and retries < 5:
-            time.sleep(0.2)
+            time.sleep(DS18B20_RETRY_DELAY)
             lines = read_ds18b20_raw(device_file)
             retries += 1
             if lines is None:
@@ -72,8 +159,28 @@ def get_ds18b20_temperature(device_file):
         print(f"Error processing DS18B20 data: {e}")
         return None
 
-def get_dht11_data():
+def get_ds18b20_data(device_file, resolution):
+    """Reads a DS18B20 sensor and returns data"""
+    temp_c = get_ds18b20_temperature(device_file)
+    if temp_c is not None:
+        return {
+            "temperature_c": round(temp_c, 2),
+            "temperature_f": round(temp_c * (9 / 5) + 32, 2),
+            "resolution_bits": resolution,
+            "status": "OK"
+        }
+    return {
+        "temperature_c": None,
+        "temperature_f": None,
+        "resolution_bits": resolution,
+        "status": "READ_FAILED"
+    }
+
+def get_dht11_data(device=None):
     """Reads DHT11 sensor and returns data"""
+    if device is None:
+        device = dhtDevice
+
     data = {
         "temperature_c": None,
         "humidity": None,
@@ -81,8 +188,8 @@ def get_dht11_data():
     }
 
     try:
-        temperature_c = dhtDevice.temperature
-        humidity = dhtDevice.humidity
+        temperature_c = device.temperature
+        humidity = device.humidity
 
         if temperature_c is not None and humidity is not None:
             data = {
@@ -114,19 +221,10 @@ def get_all_sensor_data():
     # Read DS18B20 data
     ds18b20_data = {}
     for sensor_id, device_file in ds18b20_sensors.items():
-        temp_c = get_ds18b20_temperature(device_file)
-        if temp_c is not None:
-            ds18b20_data[sensor_id] = {
-                "temperature_c": round(temp_c, 2),
-                "temperature_f": round(temp_c * (9 / 5) + 32, 2),
-                "status": "OK"
-            }
-        else:
-            ds18b20_data[sensor_id] = {
-                "temperature_c": None,
-                "temperature_f": None,
-                "status": "READ_FAILED"
-            }
+        resolution = ds18b20_resolutions.get(sensor_id)
+        if resolution is None:
+            resolution = configure_ds18b20(sensor_id, device_file)
+        ds18b20_data[sensor_id] = get_ds18b20_data(device_file, resolution)
     
     # Combine all data
     combined_data = {
@@ -146,7 +244,7 @@ def setup_one_wire():
     """Enable One-Wire interface if not already enabled"""
     try:
         # Check if One-Wire devices are detected
-        if not glob.glob(ONE_WIRE_BASE_DIR + '28*'):
+        if not glob.glob(os.path.join(ONE_WIRE_BASE_DIR, '28*')):
             print("⚠️  No DS18B20 sensors found. Please ensure:")
             print("   1. One-Wire is enabled in raspi-config")
             print("   2. DS18B20 is properly wired (VCC, GND, DATA)")
@@ -160,6 +258,7 @@ def setup_one_wire():
 if __name__ == '__main__':
     print("--- Raspberry Pi Multi-Sensor Station ---")
     print("Initializing sensors...")
+    init_dht11()
     
     # Setup One-Wire interface
     one_wire_ready = setup_one_wire()
@@ -167,18 +266,31 @@ if __name__ == '__main__':
     if one_wire_ready:
         ds18b20_sensors = find_ds18b20_sensors()
         print(f"✅ Found {len(ds18b20_sensors)} DS18B20 sensor(s)")
-        for sensor_id in ds18b20_sensors.keys():
-            print(f"   - {sensor_id}")
+        for sensor_id, device_file in ds18b20_sensors.items():
+            resolution = configure_ds18b20(sensor_id, device_file)
+            print(f"   - {sensor_id} ({resolution}-bit, "
+                  f"{get_ds18b20_conversion_time(resolution) * 1000:.0f} ms per read)")
+
+        # Every probe is read in turn, so their conversions add up each cycle
+        read_time = get_ds18b20_read_time(ds18b20_resolutions.values())
+        print(f"   DS18B20 read time per cycle: ~{read_time:.2f}s of {READ_INTERVAL}s")
+        if read_time > READ_INTERVAL:
+            print("⚠️  Probes cannot all be read within READ_INTERVAL; "
+                  "lower DS18B20_RESOLUTION or raise READ_INTERVAL")
     else:
         print("❌ No DS18B20 sensors detected")
     
     print("✅ DHT11 sensor initialized")
+    history = HistoryStore()
+    print(f"✅ Recording history to {history.path}")
     print("-" * 50)
 
     try:
         while True:
             # Read all sensors
+            cycle_start = time.monotonic()
             sensor_data = get_all_sensor_data()
+            history.add_payload(sensor_data)
             
             # Convert to JSON
             json_output = json.dumps(sensor_data, indent=2)
@@ -197,7 +309,8 @@ if __name__ == '__main__':
             # DS18B20 results
             for sensor_id, data in sensor_data['ds18b20'].items():
                 if data['status'] == "OK":
-                    print(f"✅ {sensor_id}: {data['temperature_c']}°C")
+                    print(f"✅ {sensor_id}: {data['temperature_c']}°C "
+                          f"({data['resolution_bits']}-bit)")
                 else:
                     print(f"❌ {sensor_id}: {data['status']}")
             
@@ -206,11 +319,12 @@ if __name__ == '__main__':
             print(json_output)
             print("-" * 50)
             
-            # Wait between readings
-            time.sleep(5.0)
+            # Wait for the next cycle; the time spent reading counts towards it
+            time.sleep(max(0.0, READ_INTERVAL - (time.monotonic() - cycle_start)))
 
     except KeyboardInterrupt:
         print("\n🛑 Script stopped by user.")
         # Clean up
         dhtDevice.exit()
+        history.close()
         print("Sensor connections cleaned up.")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+import traceback
+
+# --- Driver Configuration ---
+# Seconds between reads when a sensor in the config does not set "interval".
+# The serial reader waits for data itself, so it runs back to back.
+DEFAULT_INTERVALS = {"dht11": 5.0, "ds18b20": 5.0, "hd38": 1.0, "serial": 0.0}
+OPEN_RETRY_DELAY = 5.0   # Wait before retrying a sensor that failed to initialize
+STOP_TIMEOUT = 5.0       # Longest wait for a driver thread to finish its current read
+READ_ERROR_DELAY = 5.0   # Shortest wait after a read raised, so a failing driver cannot spin
+
+# Hardware libraries are imported when a driver is opened rather than at the top
+# of this module, so a station only needs the libraries of the sensors it uses.
+
+
+class DHT11Driver:
+    """DHT11 temperature/humidity sensor on a GPIO pin, e.g. {"pin": "D4"}"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.device = None
+
+    def open(self):
+        import board
+        import adafruit_dht
+        import dht11_ds18b20
+        self.station = dht11_ds18b20
+        self.device = adafruit_dht.DHT11(getattr(board, self.spec["pin"]))
+
+    def read(self):
+        data = self.station.get_dht11_data(self.device)
+        return [{"id": self.spec["id"], "timestamp": time.time(), **data}]
+
+    def close(self):
+        if self.device is not None:
+            self.device.exit()
+
+
+class DS18B20Driver:
+    """All DS18B20 probes on the one-wire bus, each reported under its own ID"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.resolutions = {}
+
+    def open(self):
+        import dht11_ds18b20
+        self.station = dht11_ds18b20
+
+    def read(self):
+        payloads = []
+        sensors = self.station.find_ds18b20_sensors(self.spec.get("base_dir"))
+        for sensor_id, device_file in sensors.items():
+            resolution = self.resolutions.get(sensor_id)
+            if resolution is None:
+                resolution = self.configure(sensor_id, device_file)
+
+            data = self.station.get_ds18b20_data(device_file, resolution)
+            payloads.append({"id": sensor_id, "timestamp": time.time(), **data})
+        return payloads
+
+    def configure(self, sensor_id, device_file):
+        """Set a newly found probe's resolution and check the read cycle still fits"""
+        resolution = self.spec.get("resolutions", {}).get(sensor_id, self.spec.get("resolution"))
+        resolution = self.station.configure_ds18b20(sensor_id, device_file, resolution)
+        # A failed read-back is retried on the next read instead of being cached
+        if resolution is None:
+            return None
+
+        self.resolutions[sensor_id] = resolution
+        read_time = self.station.get_ds18b20_read_time(self.resolutions.values())
+        if read_time > self.spec["interval"]:
+            print(f"⚠️ {self.spec['name']}: reading {len(self.resolutions)} probe(s) takes "
+                  f"~{read_time:.2f}s, longer than the {self.spec['interval']}s interval")
+        return resolution
+
+    def close(self):
+        pass
+
+
+class HD38Driver:
+    """HD-38 digital moisture output on a GPIO pin, e.g. {"pin": "D17"}"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.pin = None
+
+    def open(self):
+        import board
+        import hd38_moisture
+        self.hd38 = hd38_moisture
+        self.pin = hd38_moisture.init_hd38(getattr(board, self.spec["pin"]))
+
+    def read(self):
+        return [self.hd38.get_hd38_data(self.pin, self.spec["id"])]
+
+    def close(self):
+        if self.pin is not None:
+            self.pin.deinit()
+
+
+class SerialDriver:
+    """Arduino soil moisture boards, auto-discovered unless "ports" lists them"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.ingest = None
+
+    def open(self):
+        import read
+        self.ingest = read.SerialIngest(
+            ports=self.spec.get("ports"),
+            baud_rate=self.spec.get("baud_rate", read.BAUD_RATE),
+            dry_value=self.spec.get("dry_value", read.DRY_VALUE),
+            wet_value=self.spec.get("wet_value", read.WET_VALUE)
+        )
+
+    def read(self):
+        return self.ingest.poll()
+
+    def close(self):
+        if self.ingest is not None:
+            self.ingest.close()
+
+
+DRIVER_TYPES = {
+    "dht11": DHT11Driver,
+    "ds18b20": DS18B20Driver,
+    "hd38": HD38Driver,
+    "serial": SerialDriver,
+}
+
+
+class DriverRunner(threading.Thread):
+    """Samples one configured sensor on its own thread and queues its payloads.
+
+    The interval can be changed with retime() without interrupting sampling;
+    stop() ends the thread after the current read and releases the hardware.
+    """
+
+    def __init__(self, spec, output):
+        super().__init__(name=f"sensor-{spec['name']}", daemon=True)
+        self.spec = spec
+        self.interval = spec["interval"]
+        self.output = output
+        self.stopping = threading.Event()
+        self.wake = threading.Event()
+
+    def retime(self, interval):
+        self.interval = interval
+        self.wake.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+
+    def wait_until(self, deadline):
+        """Sleep until `deadline`, returning early on stop() and re-checking on retime()"""
+        while not self.stopping.is_set():
+            remaining = deadline() - time.monotonic()
+            if remaining <= 0:
+                return
+            self.wake.wait(remaining)
+            self.wake.clear()
+
+    def open_driver(self):
+        while not self.stopping.is_set():
+            driver = DRIVER_TYPES[self.spec["type"]](self.spec)
+            try:
+                driver.open()
+                return driver
+            except Exception as e:
+                print(f"❌ Could not initialize {self.spec['name']}: {e}")
+                driver.close()
+                retry_at = time.monotonic() + OPEN_RETRY_DELAY
+                self.wait_until(lambda: retry_at)
+        return None
+
+    def run(self):
+        driver = self.open_driver()
+        if driver is None:
+            return
+
+        try:
+            while not self.stopping.is_set():
+                last_read = time.monotonic()
+                min_delay = 0.0
+                try:
+                    for payload in driver.read():
+                        self.output.put(payload)
+                except Exception as e:
+                    print(f"⚠️ Unexpected error reading {self.spec['name']}: {e}")
+                    traceback.print_exc()
+                    # The serial driver runs with no interval at all
+                    min_delay = READ_ERROR_DELAY
+
+                self.wait_until(lambda: last_read + max(self.interval, min_delay))
+        finally:
+            driver.close()
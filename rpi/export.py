@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+from history import HISTORY_DB_PATH, HISTORY_TIERS, HistoryStore
+
+# --- Export Configuration ---
+DEFAULT_CHUNK_SIZE = 10000   # Rows held in memory at a time
+EXPORT_FORMATS = ["csv", "ndjson", "parquet"]
+
+RAW_COLUMNS = ["sensor_id", "metric", "timestamp", "value"]
+ROLLUP_COLUMNS = ["sensor_id", "metric", "timestamp", "min", "max", "mean", "count"]
+
+
+def parse_time(value):
+    """Accept a Unix timestamp or an ISO date such as 2025-01-31 or 2025-01-31T06:00"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def iter_chunks(store, tier, sensor_ids, start, end, chunk_size, cursor=None):
+    """Yield (rows, cursor) chunks of history, one sensor at a time.
+
+    Pages with a keyset cursor that seeks straight into the (sensor_id, metric,
+    time) index instead of using OFFSET, so every chunk costs the same no matter
+    how far into the export it is, and an export can be resumed from the cursor
+    of the last chunk written.
+    """
+    if tier == "raw":
+        sql = (
+            "SELECT sensor_id, metric, timestamp, value, id FROM readings "
+            "WHERE sensor_id = ? AND timestamp >= ? AND timestamp < ? "
+            "AND (metric, timestamp, id) > (?, ?, ?) "
+            "ORDER BY metric, timestamp, id LIMIT ?"
+        )
+        first_key = ["", 0, 0]
+    else:
+        sql = (
+            "SELECT sensor_id, metric, bucket, min_value, max_value, "
+            f"sum_value / count, count FROM rollup_{tier} "
+            "WHERE sensor_id = ? AND bucket >= ? AND bucket < ? "
+            "AND (metric, bucket) > (?, ?) "
+            "ORDER BY metric, bucket LIMIT ?"
+        )
+        first_key = ["", 0]
+        # Include the bucket that holds `start`
+        size = {name: size for name, size, _ in HISTORY_TIERS}[tier]
+        start = start // size * size
+
+    for sensor_id in sensor_ids:
+        if cursor is not None and sensor_id < cursor[0]:
+            continue
+        key = cursor[1:] if cursor is not None and sensor_id == cursor[0] else first_key
+
+        while True:
+            rows = store.db.execute(sql, (sensor_id, start, end, *key, chunk_size)).fetchall()
+            if not rows:
+                break
+            last = rows[-1]
+            if tier == "raw":
+                # The row id breaks ties between readings with the same timestamp
+                key = [last[1], last[2], last[4]]
+                rows = [row[:4] for row in rows]
+            else:
+                key = [last[1], last[2]]
+            yield rows, [sensor_id, *key]
+
+
+def encode_csv(columns, rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(columns, rows, header):
+    return "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows).encode('utf-8')
+
+
+class StreamExporter:
+    """Appends CSV or NDJSON chunks to a single (optionally gzipped) file.
+
+    Each chunk is written as its own gzip member, which together still form one
+    valid .gz file. The file is truncated back to the last recorded offset on
+    resume, so a chunk cut off by a crash or power loss is never duplicated.
+    """
+
+    def __init__(self, path, export_format, columns, compress, offset):
+        self.encode = encode_csv if export_format == "csv" else encode_ndjson
+        self.columns = columns
+        self.compress = compress
+        self.file = open(path, 'r+b' if offset else 'wb')
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write(self, rows):
+        data = self.encode(self.columns, rows, header=self.file.tell() == 0)
+        if self.compress:
+            data = gzip.compress(data)
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    @property
+    def offset(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExporter:
+    """Writes chunks as zstd-compressed row groups of a Parquet part file.
+
+    A Parquet file cannot be appended to once closed, so the export is a
+    directory of part files (readable as one dataset by pandas or pyarrow).
+    Each run writes one part; a part is only renamed to its final name when it
+    is closed, so a part cut off by a crash never looks complete.
+    """
+
+    def __init__(self, path, columns, part):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            print("❌ Parquet export needs pyarrow: pip3 install pyarrow")
+            raise SystemExit(1)
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.columns = columns
+        self.part_file = os.path.join(path, f"part-{part:05d}.parquet")
+        self.writer = None
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, rows):
+        table = self.pyarrow.Table.from_pylist([dict(zip(self.columns, row)) for row in rows])
+        if self.writer is None:
+            self.writer = self.parquet.ParquetWriter(self.part_file + ".tmp", table.schema,
+                                                     compression="zstd")
+        self.writer.write_table(table, row_group_size=len(rows))
+
+    @property
+    def offset(self):
+        return 0
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.part_file + ".tmp", self.part_file)
+
+
+def load_state(state_file):
+    """Load the saved cursor of an interrupted export"""
+    if not os.path.exists(state_file):
+        return None
+
+    with open(state_file, 'r') as f:
+        return json.load(f)
+
+
+def save_state(state_file, state):
+    with open(state_file + ".tmp", 'w') as f:
+        json.dump(state, f)
+    os.replace(state_file + ".tmp", state_file)
+
+
+def export_history(store, output, export_format, sensor_ids, start, end=None,
+                   tier="raw", chunk_size=DEFAULT_CHUNK_SIZE, resume=False):
+    """Stream history to `output` chunk by chunk and return the number of rows written.
+
+    CSV and NDJSON are gzipped when `output` ends in ".gz". Progress is saved to
+    "<output>.cursor" after every chunk; with `resume` the export continues from
+    there instead of starting over. `end` defaults to now, or to the end of the
+    export being resumed.
+    """
+    columns = RAW_COLUMNS if tier == "raw" else ROLLUP_COLUMNS
+    compress = output.endswith(".gz")
+    state_file = output + ".cursor"
+
+    state = load_state(state_file) if resume else None
+    if end is None:
+        end = state["settings"]["end"] if state is not None else time.time()
+
+    settings = {
+        "format": export_format,
+        "sensor_ids": sorted(sensor_ids),
+        "start": start,
+        "end": end,
+        "tier": tier,
+        "compress": compress
+    }
+
+    if state is not None and state["settings"] != settings:
+        print(f"❌ {state_file} belongs to a different export: {state['settings']}")
+        raise SystemExit(1)
+
+    if state is None:
+        state = {"settings": settings, "cursor": None, "offset": 0, "rows": 0,
+                 "part": 0, "part_cursor": None, "part_rows": 0, "part_closed": False}
+    elif state["rows"] and not os.path.exists(output):
+        print(f"❌ {output} is missing, so the export cannot be resumed. "
+              f"Delete {state_file} to start over.")
+        raise SystemExit(1)
+
+    if export_format == "parquet":
+        if state["part_closed"]:
+            # The last part was closed cleanly, so carry on in a new one
+            state["part"] += 1
+        else:
+            # The last part was never finished and is unreadable, so write it again
+            state["cursor"] = state["part_cursor"]
+            state["rows"] = state["part_rows"]
+        state["part_cursor"] = state["cursor"]
+        state["part_rows"] = state["rows"]
+        state["part_closed"] = False
+        exporter = ParquetExporter(output, columns, state["part"])
+    else:
+        exporter = StreamExporter(output, export_format, columns, compress, state["offset"])
+    if state["cursor"] is not None:
+        print(f"↪️ Resuming after {state['rows']} rows")
+
+    try:
+        for rows, cursor in iter_chunks(store, tier, settings["sensor_ids"], start, end,
+                                        chunk_size, state["cursor"]):
+            exporter.write(rows)
+            state["cursor"] = cursor
+            state["offset"] = exporter.offset
+            state["rows"] += len(rows)
+            save_state(state_file, state)
+            print(f"📦 {state['rows']} rows exported", end='\r')
+    finally:
+        exporter.close()
+        state["part_closed"] = True
+        save_state(state_file, state)
+
+    if os.path.exists(state_file):
+        os.remove(state_file)
+    return state["rows"]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export sensor history to CSV, NDJSON or Parquet")
+    parser.add_argument("output", help="Output file, gzipped if it ends in .gz (a directory for parquet)")
+    parser.add_argument("--sensor", action="append", required=True, dest="sensor_ids",
+                        help="Sensor ID to export (repeat for several)")
+    parser.add_argument("--start", type=parse_time, default=0.0,
+                        help="Unix timestamp or ISO date (default: beginning)")
+    parser.add_argument("--end", type=parse_time, default=None,
+                        help="Unix timestamp or ISO date (default: now)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--tier", choices=[tier[0] for tier in HISTORY_TIERS], default="raw",
+                        help="Raw readings or one of the rollup tiers")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--resume", action="store_true", help="Continue from <output>.cursor")
+    parser.add_argument("--db", default=HISTORY_DB_PATH)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    started = time.time()
+    try:
+        rows = export_history(
+            store, args.output, args.format, args.sensor_ids, args.start, args.end,
+            tier=args.tier, chunk_size=args.chunk_size, resume=args.resume
+        )
+        print(f"\n✅ Exported {rows} rows to {args.output} in {time.time() - started:.1f}s")
+    except KeyboardInterrupt:
+        print("\n🛑 Export stopped. Run again with --resume to continue.")
+    finally:
+        store.close()
@@ -17,29 +17,33 @@ HD38_PIN_NUM = 4
 HD38_PIN = Pin(HD38_PIN_NUM)
 SENSOR_ID = "RPI_SENSOR_1_HD38" # Unique ID for this device
 
-# Initialize the Digital Input Pin
-# The HD-38 sensor module typically outputs LOW when the threshold is met (e.g., WET)
-# and HIGH when it is not (e.g., DRY). We configure the pin as an input.
-try:
-    sensor_pin = DigitalInOut(HD38_PIN)
+# Digital input pin, created by init_hd38() so that importing this module
+# does not claim the pin
+sensor_pin = None
+
+
+def init_hd38(pin=HD38_PIN):
+    """Initialize the HD-38 digital input pin."""
+    global sensor_pin
+    # The HD-38 sensor module typically outputs LOW when the threshold is met (e.g., WET)
+    # and HIGH when it is not (e.g., DRY). We configure the pin as an input.
+    sensor_pin = DigitalInOut(pin)
     sensor_pin.direction = Direction.INPUT
     # The HD-38 usually has an internal pull-up/down but specifying PULL_UP can help stability
-    sensor_pin.pull = Pull.UP 
-except Exception as e:
-    print(f"FATAL ERROR: Could not initialize HD-38 pin (BCM {HD38_PIN_NUM}).")
-    print(f"Error: {e}")
-    # Exit if pin cannot be initialized
-    exit(1)
+    sensor_pin.pull = Pull.UP
+    return sensor_pin
 
 
-def get_hd38_data():
+def get_hd38_data(pin=None, sensor_id=SENSOR_ID):
     """Reads HD-38 digital status and returns data as a dictionary."""
     data = {}
+    if pin is None:
+        pin = sensor_pin
     
     try:
         # Read the digital value from the pin
         # value is True (HIGH) or False (LOW)
-        pin_value = sensor_pin.value
+        pin_value = pin.value
 
         # The HD-38 typically outputs LOW (False) when the condition is met (e.g., WET/TRIGGERED)
         # and HIGH (True) when the condition is NOT met.
@@ -54,7 +58,7 @@ def get_hd38_data():
         
         # Data is valid, construct the dictionary
         data = {
-            "id": SENSOR_ID,
+            "id": sensor_id,
             "timestamp": time.time(),
             "pin_value_raw": pin_value, # True/False
             "status_digital": status_text,
@@ -66,7 +70,7 @@ def get_hd38_data():
         print(f"⚠️ Unexpected Error during read: {e}")
         traceback.print_exc()
         data = {
-            "id": SENSOR_ID,
+            "id": sensor_id,
             "timestamp": time.time(),
             "status": "UNEXPECTED_ERROR",
             "message": str(e)
@@ -75,6 +79,15 @@ def get_hd38_data():
     return data
 
 if __name__ == '__main__':
+    # Initialize the Digital Input Pin
+    try:
+        init_hd38()
+    except Exception as e:
+        print(f"FATAL ERROR: Could not initialize HD-38 pin (BCM {HD38_PIN_NUM}).")
+        print(f"Error: {e}")
+        # Exit if pin cannot be initialized
+        exit(1)
+
     print(f"--- HD-38 Digital Reader Initialized (Data Pin: BCM {HD38_PIN_NUM}) ---")
     
     try:
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+# --- History Configuration ---
+HISTORY_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.db')
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# (tier name, bucket size in seconds, retention in seconds or None to keep forever)
+# The raw tier keeps every reading; the others are min/max/mean/count rollups.
+HISTORY_TIERS = [
+    ("raw", 0, 2 * DAY),
+    ("1m", MINUTE, 14 * DAY),
+    ("1h", HOUR, 365 * DAY),
+    ("1d", DAY, None),
+]
+ROLLUP_TIERS = [tier for tier in HISTORY_TIERS if tier[1] > 0]
+
+PRUNE_INTERVAL = HOUR   # How often old rows are deleted
+MAX_QUERY_POINTS = 500  # Target row count when no resolution is requested
+
+# Payload fields that are derived or descriptive rather than measurements
+SKIPPED_METRICS = {"timestamp", "temperature_f", "resolution_bits"}
+
+
+def flatten_payload(payload):
+    """Turn a sensor payload into (sensor_id, metric, value, timestamp) readings.
+
+    Handles the flat payloads of the single-sensor scripts and the serial
+    reader, as well as the combined station payload, where the DHT11 block is
+    stored as "<id>/dht11" and each DS18B20 probe under its own one-wire ID.
+    """
+    timestamp = payload.get("timestamp", time.time())
+    readings = []
+
+    def collect(sensor_id, data):
+        if data.get("status", "OK") != "OK":
+            return
+        for metric, value in data.items():
+            if metric in SKIPPED_METRICS or isinstance(value, bool):
+                continue
+            if isinstance(value, (int, float)):
+                readings.append((sensor_id, metric, float(value), timestamp))
+
+    collect(payload["id"], payload)
+    for key, value in payload.items():
+        if not isinstance(value, dict):
+            continue
+        if "status" in value:
+            collect(f"{payload['id']}/{key}", value)
+        else:
+            for probe_id, probe in value.items():
+                if isinstance(probe, dict):
+                    collect(probe_id, probe)
+
+    return readings
+
+
+def choose_tier(resolution, start=None, now=None):
+    """Pick the tier to answer a query from.
+
+    Starts at the coarsest tier whose buckets are no wider than `resolution`
+    seconds. If that tier's retention no longer reaches back to `start`, the
+    next coarser tier is used instead, so no part of the range is missing.
+    """
+    now = time.time() if now is None else now
+    index = 0
+    for position, (_, size, _) in enumerate(HISTORY_TIERS):
+        if size <= resolution:
+            index = position
+
+    for tier in HISTORY_TIERS[index:]:
+        retention = tier[2]
+        if start is None or retention is None or start >= now - retention:
+            return tier
+    return HISTORY_TIERS[-1]
+
+
+class HistoryStore:
+    """Local sensor history with incrementally built rollups.
+
+    Every reading goes into the raw table and updates the 1-minute, 1-hour and
+    1-day rollups in the same transaction, so long-range queries never have to
+    scan raw data. Each tier is pruned to its own retention.
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        # WAL with relaxed syncing keeps SD card writes small
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.create_tables()
+        self.next_prune = 0.0
+
+    def create_tables(self):
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS readings ("
+                "id INTEGER PRIMARY KEY, sensor_id TEXT NOT NULL, metric TEXT NOT NULL, "
+                "timestamp REAL NOT NULL, value REAL NOT NULL)"
+            )
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS readings_sensor_time "
+                "ON readings (sensor_id, metric, timestamp)"
+            )
+            self.db.execute(
+                "CREATE INDEX IF NOT EXISTS readings_time ON readings (timestamp)"
+            )
+            for name, _, _ in ROLLUP_TIERS:
+                self.db.execute(
+                    f"CREATE TABLE IF NOT EXISTS rollup_{name} ("
+                    "sensor_id TEXT NOT NULL, metric TEXT NOT NULL, bucket INTEGER NOT NULL, "
+                    "min_value REAL NOT NULL, max_value REAL NOT NULL, "
+                    "sum_value REAL NOT NULL, count INTEGER NOT NULL, "
+                    "PRIMARY KEY (sensor_id, metric, bucket)) WITHOUT ROWID"
+                )
+
+    def add_readings(self, readings):
+        """Store (sensor_id, metric, value, timestamp) readings and update the rollups"""
+        if not readings:
+            return
+
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO readings (sensor_id, metric, value, timestamp) VALUES (?, ?, ?, ?)",
+                readings
+            )
+            for name, size, _ in ROLLUP_TIERS:
+                self.db.executemany(
+                    f"INSERT INTO rollup_{name} "
+                    "(sensor_id, metric, bucket, min_value, max_value, sum_value, count) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 1) "
+                    "ON CONFLICT (sensor_id, metric, bucket) DO UPDATE SET "
+                    "min_value = min(min_value, excluded.min_value), "
+                    "max_value = max(max_value, excluded.max_value), "
+                    "sum_value = sum_value + excluded.sum_value, "
+                    "count = count + 1",
+                    [(sensor_id, metric, int(timestamp // size) * size, value, value, value)
+                     for sensor_id, metric, value, timestamp in readings]
+                )
+
+        if time.time() >= self.next_prune:
+            self.prune()
+
+    def add_payload(self, payload):
+        """Store every measurement in a sensor payload"""
+        self.add_readings(flatten_payload(payload))
+
+    def prune(self, now=None):
+        """Delete rows that are older than their tier's retention"""
+        now = time.time() if now is None else now
+        with self.db:
+            for name, _, retention in HISTORY_TIERS:
+                if retention is None:
+                    continue
+                if name == "raw":
+                    self.db.execute("DELETE FROM readings WHERE timestamp < ?", (now - retention,))
+                else:
+                    self.db.execute(f"DELETE FROM rollup_{name} WHERE bucket < ?", (now - retention,))
+        self.next_prune = now + PRUNE_INTERVAL
+
+    def query(self, sensor_id, metric, start, end, resolution=None):
+        """Return min/max/mean/count rows for a sensor metric between `start` and `end`.
+
+        Reads from the coarsest tier that still meets `resolution` (seconds), or a
+        coarser one if its retention does not reach back to `start`, and merges
+        its buckets up to that resolution, rounded up to a whole number of buckets.
+        Without a resolution, one is chosen so the range comes back in about
+        MAX_QUERY_POINTS rows.
+        """
+        if resolution is None:
+            resolution = max(1, (end - start) / MAX_QUERY_POINTS)
+        resolution = max(1, int(resolution))
+        name, size, _ = choose_tier(resolution, start)
+        if size:
+            # Merge whole tier buckets only, and include the bucket holding `start`
+            resolution = (resolution + size - 1) // size * size
+            start = start // size * size
+
+        if name == "raw":
+            sql = (
+                "SELECT CAST(timestamp / ? AS INTEGER) * ? AS bucket, "
+                "min(value), max(value), sum(value), count(*) "
+                "FROM readings WHERE sensor_id = ? AND metric = ? "
+                "AND timestamp >= ? AND timestamp < ? "
+                "GROUP BY bucket ORDER BY bucket"
+            )
+        else:
+            sql = (
+                "SELECT CAST(bucket / ? AS INTEGER) * ? AS merged, "
+                "min(min_value), max(max_value), sum(sum_value), sum(count) "
+                f"FROM rollup_{name} WHERE sensor_id = ? AND metric = ? "
+                "AND bucket >= ? AND bucket < ? "
+                "GROUP BY merged ORDER BY merged"
+            )
+
+        rows = self.db.execute(sql, (resolution, resolution, sensor_id, metric, start, end))
+        return [
+            {
+                "timestamp": bucket,
+                "min": min_value,
+                "max": max_value,
+                "mean": sum_value / count,
+                "count": count
+            }
+            for bucket, min_value, max_value, sum_value, count in rows
+        ]
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Query the local sensor history")
+    parser.add_argument("sensor_id")
+    parser.add_argument("metric", help="e.g. temperature_c, humidity, moisture_percentage")
+    parser.add_argument("--hours", type=float, default=24.0, help="How far back to query")
+    parser.add_argument("--resolution", type=float, help="Bucket size in seconds")
+    parser.add_argument("--db", default=HISTORY_DB_PATH)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    end = time.time()
+    for row in store.query(args.sensor_id, args.metric, end - args.hours * HOUR, end, args.resolution):
+        print(json.dumps(row))
+    store.close()
@@ -1 +1,260 @@
-print("PROJECT TERRA MAIN MODULE")
+#!/usr/bin/env python3
+
+import json
+import os
+import queue
+import signal
+import time
+
+from dht11_ds18b20 import DS18B20_CONVERSION_TIMES
+from drivers import DEFAULT_INTERVALS, DRIVER_TYPES, STOP_TIMEOUT, DriverRunner
+from history import HistoryStore, flatten_payload
+
+# --- Station Configuration ---
+# Every sensor instance (type, pin, ID, interval, ...) is described in this file.
+# Edit it while the station is running and the changes are applied within
+# CONFIG_CHECK_INTERVAL seconds, or at once with: pkill -HUP -f main.py
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensors.json')
+CONFIG_CHECK_INTERVAL = 2.0
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_sensor_fields(name, spec):
+    """Raise ValueError for a type-specific field a driver could not use"""
+    sensor_type = spec["type"]
+    if sensor_type in ("dht11", "hd38") and not isinstance(spec.get("pin"), str):
+        raise ValueError(f'{name}: "pin" must be a board pin name such as "D4"')
+
+    if sensor_type == "ds18b20":
+        if not isinstance(spec.get("base_dir") or "", str):
+            raise ValueError(f'{name}: "base_dir" must be a path')
+        resolutions = spec.get("resolutions")
+        resolutions = {} if resolutions is None else resolutions
+        if not isinstance(resolutions, dict):
+            raise ValueError(f'{name}: "resolutions" must map probe IDs to bits')
+        for resolution in [spec.get("resolution"), *resolutions.values()]:
+            if resolution is not None and resolution not in DS18B20_CONVERSION_TIMES:
+                raise ValueError(f"{name}: resolution must be one of "
+                                 f"{sorted(DS18B20_CONVERSION_TIMES)} bits, not {resolution!r}")
+
+    if sensor_type == "serial":
+        ports = spec.get("ports")
+        if ports is not None and (not isinstance(ports, dict) or
+                                  not all(isinstance(path, str) for path in ports.values())):
+            raise ValueError(f'{name}: "ports" must map board IDs to port paths, or be null')
+        for key in ("baud_rate", "dry_value", "wet_value"):
+            if key in spec and not is_number(spec[key]):
+                raise ValueError(f'{name}: "{key}" must be a number')
+        if "dry_value" in spec and spec["dry_value"] == spec.get("wet_value"):
+            raise ValueError(f'{name}: "dry_value" and "wet_value" must differ')
+
+
+def load_config(path=CONFIG_PATH):
+    """Load the sensor config and return {name: sensor spec} for the enabled sensors"""
+    with open(path, 'r') as f:
+        config = json.load(f)
+
+    # Wrong structure is reported like a syntax error, so a bad edit never
+    # takes the running station down
+    if not isinstance(config, dict):
+        raise ValueError("the config must be a JSON object")
+    if not isinstance(config.get("sensors", []), list):
+        raise ValueError('"sensors" must be a list')
+
+    sensors = {}
+    for spec in config.get("sensors", []):
+        if not isinstance(spec, dict):
+            raise ValueError(f"every sensor must be a JSON object, not {spec!r}")
+        name = spec.get("name")
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"every sensor needs a name: {spec!r}")
+        if name in sensors:
+            raise ValueError(f"duplicate sensor name: {name}")
+        if not isinstance(spec.get("type"), str) or spec["type"] not in DRIVER_TYPES:
+            raise ValueError(f"{name}: unknown sensor type {spec.get('type')!r}")
+        if not spec.get("enabled", True):
+            continue
+        check_sensor_fields(name, spec)
+
+        spec = dict(spec)
+        spec.setdefault("id", name)
+        spec.setdefault("interval", DEFAULT_INTERVALS[spec["type"]])
+        interval = spec["interval"]
+        if not is_number(interval) or interval < 0:
+            raise ValueError(f"{name}: interval must be a number of seconds")
+        sensors[name] = spec
+
+    return sensors
+
+
+def diff_config(old, new):
+    """Compare two configs and return the (added, removed, retimed, changed) sensor names.
+
+    A sensor whose only change is its interval is retimed in place; any other
+    change restarts just that sensor.
+    """
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    retimed = []
+    changed = []
+
+    for name in new:
+        if name not in old or old[name] == new[name]:
+            continue
+        old_spec = {key: value for key, value in old[name].items() if key != "interval"}
+        new_spec = {key: value for key, value in new[name].items() if key != "interval"}
+        if old_spec == new_spec:
+            retimed.append(name)
+        else:
+            changed.append(name)
+
+    return added, removed, retimed, changed
+
+
+class Station:
+    """Runs every configured sensor and reloads the config file when it changes"""
+
+    def __init__(self, config_path=CONFIG_PATH, history=None, echo=True):
+        self.config_path = config_path
+        self.history = history
+        self.echo = echo
+        self.output = queue.Queue()
+        self.runners = {}
+        # Runners that did not stop within STOP_TIMEOUT, and the sensors waiting
+        # for them to release their hardware before (re)starting
+        self.stopping = {}
+        self.pending = {}
+        self.config = {}
+        self.config_mtime = None
+        self.next_config_check = 0.0
+        self.reload_requested = False
+
+    def start_sensor(self, spec):
+        """Start a sensor, or hold it back while its previous runner is still stopping"""
+        name = spec["name"]
+        previous = self.stopping.get(name)
+        if previous is not None and previous.is_alive():
+            if name not in self.pending:
+                print(f"⏳ Waiting for {name} to release its hardware before starting it")
+            self.pending[name] = spec
+            return False
+
+        self.stopping.pop(name, None)
+        self.pending.pop(name, None)
+        runner = DriverRunner(spec, self.output)
+        self.runners[name] = runner
+        runner.start()
+        return True
+
+    def start_pending(self):
+        """Start the held-back sensors whose previous runner has finished"""
+        for spec in list(self.pending.values()):
+            self.start_sensor(spec)
+
+    def stop_sensors(self, names):
+        runners = {name: self.runners.pop(name) for name in names if name in self.runners}
+        for name in names:
+            self.pending.pop(name, None)
+        for runner in runners.values():
+            runner.stop()
+        for name, runner in runners.items():
+            runner.join(STOP_TIMEOUT)
+            if runner.is_alive():
+                print(f"⚠️ {name} is still finishing a read after {STOP_TIMEOUT}s")
+                self.stopping[name] = runner
+
+    def reload(self):
+        """Apply the config file, starting, stopping or retiming only the sensors that changed"""
+        self.reload_requested = False
+        try:
+            # Remember the broken file too, so the error is reported once per edit
+            self.config_mtime = os.stat(self.config_path).st_mtime
+            new_config = load_config(self.config_path)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not load {self.config_path}: {e}")
+            print("   Keeping the current sensors running.")
+            return False
+
+        added, removed, retimed, changed = diff_config(self.config, new_config)
+
+        # Stop first, so a restarted sensor's pin is free again
+        self.stop_sensors(removed + changed)
+        for name in retimed:
+            if name in self.runners:
+                self.runners[name].retime(new_config[name]["interval"])
+            else:
+                self.pending[name] = new_config[name]
+        for name in changed + added:
+            self.start_sensor(new_config[name])
+        self.config = new_config
+
+        for label, names in (("Started", added), ("Stopped", removed),
+                             ("Retimed", retimed), ("Restarted", changed)):
+            if names:
+                print(f"🔄 {label}: {', '.join(names)}")
+        return True
+
+    def check_config(self):
+        """Reload the config if the file changed or a reload was requested"""
+        self.start_pending()
+        now = time.monotonic()
+        if not self.reload_requested and now < self.next_config_check:
+            return
+        self.next_config_check = now + CONFIG_CHECK_INTERVAL
+
+        try:
+            mtime = os.stat(self.config_path).st_mtime
+        except OSError:
+            return
+        if self.reload_requested or mtime != self.config_mtime:
+            self.reload()
+
+    def process(self, timeout):
+        """Wait up to `timeout` seconds for payloads, then print and record them"""
+        payloads = []
+        try:
+            payloads.append(self.output.get(timeout=timeout))
+            while True:
+                payloads.append(self.output.get_nowait())
+        except queue.Empty:
+            pass
+
+        if self.echo:
+            for payload in payloads:
+                print(json.dumps(payload))
+        if self.history is not None:
+            self.history.add_readings([reading for payload in payloads
+                                       for reading in flatten_payload(payload)])
+        return payloads
+
+    def run(self):
+        self.reload()
+        while True:
+            self.check_config()
+            self.process(CONFIG_CHECK_INTERVAL)
+
+    def close(self):
+        self.stop_sensors(list(self.runners))
+        for runner in self.stopping.values():
+            runner.join(STOP_TIMEOUT)
+
+
+if __name__ == '__main__':
+    print("PROJECT TERRA MAIN MODULE")
+    print(f"Loading sensors from {CONFIG_PATH}...")
+
+    history = HistoryStore()
+    station = Station(CONFIG_PATH, history)
+    signal.signal(signal.SIGHUP, lambda signum, frame: setattr(station, "reload_requested", True))
+
+    try:
+        station.run()
+    except KeyboardInterrupt:
+        print("\n🛑 Station stopped by user.")
+    finally:
+        station.close()
+        history.close()
+        print("Sensor connections cleaned up.")
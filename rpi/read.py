@@ -1,46 +1,245 @@
-import serial
+#!/usr/bin/env python3
+
+import glob
+import json
+import os
+import re
+import selectors
 import time
 
+import serial
+
+from history import HistoryStore, flatten_payload
+
 # --- YOU MUST CALIBRATE THESE VALUES ---
 # Change these values to YOUR sensor's readings (e.g., in air vs. in water)
 DRY_VALUE = 600   # Raw value when the sensor is in the air (0% moisture)
 WET_VALUE = 250   # Raw value when the sensor is submerged in water (100% moisture)
 
-# --- YOUR PORT NAME ---
-# Change this to what you found in Step 2.2 (e.g., '/dev/ttyACM0')
-PORT_NAME = '/dev/ttyUSB0' 
-BAUD_RATE = 9600 
-
-print(f"Attempting to connect to Arduino on {PORT_NAME}...")
-
-try:
-    ser = serial.Serial(PORT_NAME, BAUD_RATE, timeout=1)
-    ser.flush()
-    print("Connection established. Reading data...")
-    
-    while True:
-        if ser.in_waiting > 0:
-            # Read the incoming line (the raw number from Arduino)
-            line = ser.readline().decode('utf-8').rstrip()
-            
-            if line.isdigit():
-                raw_value = int(line)
-                
-                # Formula to map the raw value to a percentage (0-100)
-                moisture_percentage = int(((DRY_VALUE - raw_value) / (DRY_VALUE - WET_VALUE)) * 100)
-                moisture_percentage = max(0, min(100, moisture_percentage))
-
-                # Output
-                print(f"RAW: {raw_value} | Moisture: {moisture_percentage}%", end='\r') 
-        
-        time.sleep(0.5)
-
-except serial.SerialException as e:
-    print(f"\n ERROR: Could not open serial port {PORT_NAME}. Check cable and port name.")
-except KeyboardInterrupt:
-    print("\nScript terminated by user.")
-except Exception as e:
-    print(f"\nAn unexpected error occurred: {e}")
-finally:
-    if 'ser' in locals() and ser.is_open:
-        ser.close() 
+# --- PORT DISCOVERY ---
+# Boards are found through the stable /dev/serial/by-id links, so a probe keeps
+# its board ID even when it is re-plugged into a different USB socket.
+SERIAL_BY_ID_DIR = '/dev/serial/by-id/'
+ARDUINO_PORT_PATTERNS = ['*Arduino*', '*1a86*', '*CH340*', '*FTDI*', '*wch.cn*']
+# Used only when /dev/serial/by-id is missing or has no matching boards
+FALLBACK_PORT_PATTERNS = ['/dev/ttyUSB*', '/dev/ttyACM*']
+BAUD_RATE = 9600
+
+# --- RECONNECT / POLLING ---
+RECONNECT_MIN_DELAY = 1.0    # First retry after an unplug or failed open (seconds)
+RECONNECT_MAX_DELAY = 60.0   # Backoff doubles up to this limit
+DISCOVERY_INTERVAL = 5.0     # How often to look for newly plugged boards
+SELECT_TIMEOUT = 0.5         # Longest wait for data from any port
+MAX_LINE_LENGTH = 256        # Drop garbage that never ends with a newline
+
+# Accepts a whole line holding a bare number ("512") or the Arduino sketch
+# format ("RAW=512" or "RAW=512  Moisture=49%  D0=1"), so fragments of a line
+# never match
+RAW_VALUE_PATTERN = re.compile(r'(?:RAW=(\d+)(?:\s.*)?|(\d+))')
+
+
+def discover_ports():
+    """Find connected Arduino boards and return {board_id: port_path}"""
+    ports = {}
+    for pattern in ARDUINO_PORT_PATTERNS:
+        for path in glob.glob(SERIAL_BY_ID_DIR + pattern):
+            ports[os.path.basename(path)] = path
+
+    if not ports:
+        for pattern in FALLBACK_PORT_PATTERNS:
+            for path in glob.glob(pattern):
+                ports[os.path.basename(path)] = path
+
+    return ports
+
+
+def parse_raw_value(line):
+    """Extract the raw analog value from a line sent by the Arduino"""
+    match = RAW_VALUE_PATTERN.fullmatch(line.strip())
+    if match is None:
+        return None
+    return int(match.group(1) or match.group(2))
+
+
+def get_moisture_percentage(raw_value, dry_value=DRY_VALUE, wet_value=WET_VALUE):
+    """Map a raw value to a percentage (0-100) using the calibration values"""
+    moisture_percentage = int(((dry_value - raw_value) / (dry_value - wet_value)) * 100)
+    return max(0, min(100, moisture_percentage))
+
+
+class SerialPort:
+    """Connection state for one board"""
+
+    def __init__(self, board_id, path):
+        self.board_id = board_id
+        self.path = path
+        self.ser = None
+        self.buffer = b''
+        # False until the first newline, so a line cut off by a (re)connect or
+        # an overflow discard is never parsed
+        self.synced = False
+        self.failures = 0
+        self.next_attempt = 0.0
+
+    @property
+    def is_connected(self):
+        return self.ser is not None
+
+
+class SerialIngest:
+    """Reads every moisture board from a single selector loop.
+
+    Ports are discovered through /dev/serial/by-id unless a fixed
+    {board_id: port_path} mapping is given. A board that is unplugged or fails
+    to open is retried with exponential backoff while the others keep reading.
+    """
+
+    def __init__(self, ports=None, baud_rate=BAUD_RATE, dry_value=DRY_VALUE, wet_value=WET_VALUE):
+        self.fixed_ports = ports
+        self.baud_rate = baud_rate
+        self.dry_value = dry_value
+        self.wet_value = wet_value
+        self.selector = selectors.DefaultSelector()
+        self.ports = {}
+        self.next_discovery = 0.0
+
+    def refresh_ports(self):
+        """Pick up newly plugged boards and forget unplugged ones"""
+        found = self.fixed_ports if self.fixed_ports is not None else discover_ports()
+
+        for board_id, path in found.items():
+            if board_id not in self.ports:
+                self.ports[board_id] = SerialPort(board_id, path)
+                print(f"🔌 Found board {board_id} on {path}")
+
+        for board_id in list(self.ports):
+            port = self.ports[board_id]
+            if board_id not in found and not port.is_connected:
+                del self.ports[board_id]
+                print(f"🔌 Board {board_id} removed")
+
+    def connect(self, port):
+        try:
+            port.ser = serial.Serial(port.path, self.baud_rate, timeout=0)
+            port.ser.reset_input_buffer()
+        except (serial.SerialException, OSError) as e:
+            port.ser = None
+            self.schedule_reconnect(port)
+            print(f"❌ Could not open {port.path} ({e}), retrying in "
+                  f"{port.next_attempt - time.monotonic():.0f}s")
+            return
+
+        port.buffer = b''
+        port.synced = False
+        port.failures = 0
+        self.selector.register(port.ser.fileno(), selectors.EVENT_READ, port)
+        print(f"✅ Connected to {port.board_id} on {port.path}")
+
+    def disconnect(self, port, reason):
+        if port.ser is not None:
+            try:
+                self.selector.unregister(port.ser.fileno())
+            except (KeyError, ValueError):
+                pass
+            try:
+                port.ser.close()
+            except (serial.SerialException, OSError):
+                pass
+            port.ser = None
+        self.schedule_reconnect(port)
+        print(f"⚠️ Lost {port.board_id} ({reason}), reconnecting...")
+
+    def schedule_reconnect(self, port):
+        delay = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * (2 ** port.failures))
+        port.failures += 1
+        port.next_attempt = time.monotonic() + delay
+
+    def read_port(self, port):
+        """Read whatever is waiting on a port and return the complete lines"""
+        try:
+            data = port.ser.read(port.ser.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self.disconnect(port, e)
+            return []
+
+        port.buffer += data
+        *lines, port.buffer = port.buffer.split(b'\n')
+        if not port.synced and lines:
+            lines.pop(0)
+            port.synced = True
+        if len(port.buffer) > MAX_LINE_LENGTH:
+            port.buffer = b''
+            port.synced = False
+        return [line.decode('utf-8', errors='replace').rstrip() for line in lines]
+
+    def build_record(self, port, line):
+        raw_value = parse_raw_value(line)
+        if raw_value is None:
+            return None
+
+        return {
+            "id": port.board_id,
+            "port": port.path,
+            "timestamp": time.time(),
+            "raw_value": raw_value,
+            "moisture_percentage": get_moisture_percentage(raw_value, self.dry_value, self.wet_value),
+            "status": "OK"
+        }
+
+    def poll(self, timeout=SELECT_TIMEOUT):
+        """Wait up to `timeout` seconds and return the records read from all ports"""
+        now = time.monotonic()
+        if now >= self.next_discovery:
+            self.refresh_ports()
+            self.next_discovery = now + DISCOVERY_INTERVAL
+
+        for port in self.ports.values():
+            if not port.is_connected and now >= port.next_attempt:
+                self.connect(port)
+
+        # Wake up in time for the next reconnect attempt
+        pending = [port.next_attempt for port in self.ports.values() if not port.is_connected]
+        if pending:
+            timeout = max(0.0, min(timeout, min(pending) - time.monotonic()))
+
+        records = []
+        if not self.selector.get_map():
+            time.sleep(timeout)
+            return records
+
+        for key, _ in self.selector.select(timeout):
+            port = key.data
+            for line in self.read_port(port):
+                record = self.build_record(port, line)
+                if record is not None:
+                    records.append(record)
+        return records
+
+    def close(self):
+        for port in self.ports.values():
+            if port.ser is not None:
+                self.selector.unregister(port.ser.fileno())
+                port.ser.close()
+                port.ser = None
+        self.selector.close()
+
+
+if __name__ == '__main__':
+    print("--- Soil Moisture Serial Reader ---")
+    print(f"Looking for Arduino boards in {SERIAL_BY_ID_DIR}...")
+
+    ingest = SerialIngest()
+    history = HistoryStore()
+    try:
+        while True:
+            records = ingest.poll()
+            for record in records:
+                print(json.dumps(record))
+            history.add_readings([reading for record in records
+                                  for reading in flatten_payload(record)])
+
+    except KeyboardInterrupt:
+        print("\nScript terminated by user.")
+    finally:
+        ingest.close()
+        history.close()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import sys
+import threading
+import tty
+import types
+
+# --- Simulated Hardware ---
+# Stand-ins for the sensors so the full station can run without a Pi, e.g. for
+# soak testing. The reader modules run unchanged on top of them: the one-wire
+# bus is a fake sysfs tree and the Arduino boards are pseudo-terminals.
+SIMULATED_PROBES = 3         # DS18B20 probes on the fake one-wire bus
+SIMULATED_BOARDS = 2         # Arduino boards on pseudo-terminals
+DHT_ERROR_RATE = 0.1         # Real DHT11s fail a checksum every few reads
+
+
+class SimulatedDHT11:
+    """Stands in for adafruit_dht.DHT11, including its occasional read errors"""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.random = random.Random(pin)
+
+    @property
+    def temperature(self):
+        if self.random.random() < DHT_ERROR_RATE:
+            raise RuntimeError("Checksum did not validate. Try again.")
+        return float(round(self.random.gauss(24, 1)))
+
+    @property
+    def humidity(self):
+        return float(self.random.randint(40, 70))
+
+    def exit(self):
+        pass
+
+
+class SimulatedDigitalInOut:
+    """Stands in for digitalio.DigitalInOut on an HD-38 output"""
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = None
+        self.pull = None
+        self.random = random.Random(pin)
+
+    @property
+    def value(self):
+        return self.random.random() < 0.5
+
+    def deinit(self):
+        pass
+
+
+def install_simulated_gpio():
+    """Register simulated board, adafruit_dht and digitalio modules in place of Blinka"""
+    board = types.ModuleType("board")
+    for number in range(28):
+        setattr(board, f"D{number}", number)
+
+    adafruit_dht = types.ModuleType("adafruit_dht")
+    adafruit_dht.DHT11 = SimulatedDHT11
+
+    digitalio = types.ModuleType("digitalio")
+    digitalio.DigitalInOut = SimulatedDigitalInOut
+    digitalio.Direction = types.SimpleNamespace(INPUT="INPUT", OUTPUT="OUTPUT")
+    digitalio.Pull = types.SimpleNamespace(UP="UP", DOWN="DOWN")
+
+    # hd38_moisture.py builds its default pin from the bcm283x Pin class
+    pin = types.ModuleType("adafruit_blinka.microcontroller.bcm283x.pin")
+    pin.Pin = lambda number: number
+    modules = {
+        "board": board,
+        "adafruit_dht": adafruit_dht,
+        "digitalio": digitalio,
+        "adafruit_blinka.microcontroller.bcm283x.pin": pin,
+    }
+    for name in ("adafruit_blinka", "adafruit_blinka.microcontroller",
+                 "adafruit_blinka.microcontroller.bcm283x"):
+        modules[name] = types.ModuleType(name)
+    modules["adafruit_blinka.microcontroller.bcm283x"].pin = pin
+
+    sys.modules.update(modules)
+
+
+def create_one_wire_bus(base_dir, count=SIMULATED_PROBES):
+    """Create a fake w1 sysfs tree with `count` DS18B20 probes"""
+    for index in range(count):
+        folder = os.path.join(base_dir, f"28-{index:012x}")
+        os.makedirs(folder, exist_ok=True)
+        temperature = 20000 + index * 625
+        with open(os.path.join(folder, 'w1_slave'), 'w') as f:
+            f.write("50 05 4b 46 7f ff 0c 10 1c : crc=1c YES\n")
+            f.write(f"50 05 4b 46 7f ff 0c 10 1c t={temperature}\n")
+        with open(os.path.join(folder, 'resolution'), 'w') as f:
+            f.write("12\n")
+    return base_dir
+
+
+class SimulatedSerialBoard(threading.Thread):
+    """An Arduino running the soil moisture sketch, on a pseudo-terminal"""
+
+    def __init__(self, board_id, interval=1.0):
+        super().__init__(name=f"simulated-{board_id}", daemon=True)
+        self.board_id = board_id
+        self.interval = interval
+        self.master, self.slave = os.openpty()
+        # No echo or line editing, like a real USB serial port
+        tty.setraw(self.slave)
+        # Drop lines rather than block while the reader is disconnected
+        os.set_blocking(self.master, False)
+        self.path = os.ttyname(self.slave)
+        self.stopping = threading.Event()
+        self.random = random.Random(board_id)
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            raw_value = self.random.randint(250, 600)
+            line = f"RAW={raw_value}  Moisture={(1023 - raw_value) * 100 // 1023}%  D0=1\r\n"
+            try:
+                os.write(self.master, line.encode('ascii'))
+            except BlockingIOError:
+                pass
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+        os.close(self.master)
+        os.close(self.slave)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import simulated
+from drivers import DEFAULT_INTERVALS
+from history import HistoryStore
+from main import Station
+
+# --- Soak Configuration ---
+# Runs the whole station (drivers, reader modules, history) on simulated
+# hardware at accelerated rates and fails when resource use keeps growing.
+# Growth is measured from the first sample after the warm-up, so start-up
+# allocations (imports, SQLite page cache) do not count against the budgets.
+DEFAULT_HOURS = 4.0
+DEFAULT_SPEEDUP = 20.0         # Sensors are read this many times faster than normal
+SAMPLE_INTERVAL = 60.0         # Seconds between resource samples
+WARMUP = 120.0                 # Seconds before the baseline sample is taken
+RELOAD_INTERVAL = 300.0        # Seconds between config reloads (0 to disable)
+TOP_ALLOCATORS = 10            # Allocation sites listed in the report and on failure
+SAMPLE_TOP_ALLOCATORS = 3      # Allocation sites listed with every sample
+
+DEFAULT_BUDGETS = {
+    "rss_mb": 10.0,            # Resident memory growth
+    "traced_mb": 5.0,          # Python heap growth seen by tracemalloc
+    "fds": 4,                  # Open file descriptor growth
+    "threads": 2,              # Thread count growth
+    "cpu_percent": 50.0,       # CPU use of one core over any sample window
+}
+
+MB = 1024 * 1024
+
+
+def get_rss_mb():
+    """Current resident set size of this process"""
+    with open('/proc/self/statm', 'r') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / MB
+
+
+def count_open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def take_sample(started, payloads):
+    return {
+        "elapsed": time.monotonic() - started,
+        "rss_mb": get_rss_mb(),
+        "traced_mb": tracemalloc.get_traced_memory()[0] / MB,
+        "fds": count_open_fds(),
+        "threads": threading.active_count(),
+        "cpu_s": time.process_time(),
+        "payloads": payloads,
+    }
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ])
+
+
+def check_budgets(baseline, previous, sample, budgets):
+    """Return a description of every budget the sample exceeds"""
+    violations = []
+    for key in ("rss_mb", "traced_mb", "fds", "threads"):
+        growth = sample[key] - baseline[key]
+        if growth > budgets[key]:
+            violations.append(f"{key} grew by {growth:.1f} (budget {budgets[key]})")
+
+    cpu_percent = get_cpu_percent(previous, sample)
+    if cpu_percent > budgets["cpu_percent"]:
+        violations.append(f"CPU at {cpu_percent:.1f}% (budget {budgets['cpu_percent']}%)")
+    return violations
+
+
+def get_cpu_percent(previous, sample):
+    wall = sample["elapsed"] - previous["elapsed"]
+    if wall <= 0:
+        return 0.0
+    return (sample["cpu_s"] - previous["cpu_s"]) / wall * 100
+
+
+def format_sample(sample, baseline, previous):
+    hours, rest = divmod(int(sample["elapsed"]), 3600)
+    minutes, seconds = divmod(rest, 60)
+    line = f"⏱️ {hours:02d}:{minutes:02d}:{seconds:02d}"
+    for key, label, value_format in (("rss_mb", "RSS", ".1f"), ("traced_mb", "heap", ".1f"),
+                                     ("fds", "fds", "d"), ("threads", "threads", "d")):
+        unit = " MB" if key.endswith("_mb") else ""
+        line += f" | {label} {sample[key]:{value_format}}{unit}"
+        if baseline is not None:
+            line += f" ({sample[key] - baseline[key]:+{value_format}})"
+    line += f" | CPU {get_cpu_percent(previous, sample):.1f}%"
+    line += f" | {sample['payloads']} payloads"
+    return line
+
+
+def print_top_allocators(baseline_snapshot, limit=TOP_ALLOCATORS):
+    print(f"\n🔍 Top {limit} allocation sites by growth since the baseline:")
+    for stat in take_snapshot().compare_to(baseline_snapshot, 'lineno')[:limit]:
+        print(f"   {stat}")
+
+
+def format_top_allocators(baseline_snapshot, limit=SAMPLE_TOP_ALLOCATORS):
+    """Short list of the fastest growing allocation sites, printed under each sample"""
+    stats = [stat for stat in take_snapshot().compare_to(baseline_snapshot, 'lineno')
+             if stat.size_diff > 0]
+    lines = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"   {os.path.basename(frame.filename)}:{frame.lineno} "
+                     f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks)")
+    return "\n".join(lines)
+
+
+# Each reload makes the next of these changes, so retiming, restarting and
+# starting/stopping a sensor are all exercised
+RELOAD_CHANGES = ["retime", "restart", "toggle"]
+
+
+def write_soak_config(path, one_wire_dir, boards, speedup, dht11_slow=False,
+                      ds18b20_resolution=9, hd38_enabled=True):
+    """Write a sensors.json with every sensor type, read `speedup` times faster.
+
+    `dht11_slow` doubles the DHT11 interval (a retime), a different
+    `ds18b20_resolution` restarts the DS18B20 driver and `hd38_enabled`
+    starts or stops the HD-38.
+    """
+    sensors = [
+        {"name": "dht11", "type": "dht11", "pin": "D4",
+         "interval": DEFAULT_INTERVALS["dht11"] / speedup * (2 if dht11_slow else 1)},
+        {"name": "ds18b20", "type": "ds18b20", "base_dir": one_wire_dir,
+         "resolution": ds18b20_resolution,
+         "interval": DEFAULT_INTERVALS["ds18b20"] / speedup},
+        {"name": "hd38", "type": "hd38", "pin": "D17", "enabled": hd38_enabled,
+         "interval": DEFAULT_INTERVALS["hd38"] / speedup},
+    ]
+    if boards:
+        sensors.append({"name": "soil_moisture", "type": "serial",
+                        "ports": {board.board_id: board.path for board in boards}})
+
+    with open(path + ".tmp", 'w') as f:
+        json.dump({"sensors": sensors}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def run_soak(hours, speedup, budgets, sample_interval=SAMPLE_INTERVAL, warmup=WARMUP,
+             reload_interval=RELOAD_INTERVAL, probes=simulated.SIMULATED_PROBES,
+             board_count=simulated.SIMULATED_BOARDS):
+    """Run the station on simulated hardware and return True if it stayed within budget"""
+    simulated.install_simulated_gpio()
+    tracemalloc.start()
+
+    try:
+        import serial  # noqa: F401
+    except ImportError:
+        print("⚠️ pyserial is not installed, skipping the serial moisture boards")
+        board_count = 0
+
+    with tempfile.TemporaryDirectory(prefix="terra-soak-") as work_dir:
+        one_wire_dir = simulated.create_one_wire_bus(os.path.join(work_dir, 'w1'), probes)
+        boards = [simulated.SimulatedSerialBoard(f"SIMULATED_BOARD_{index}", 1.0 / speedup)
+                  for index in range(board_count)]
+        for board in boards:
+            board.start()
+
+        config_path = os.path.join(work_dir, 'sensors.json')
+        variant = {"dht11_slow": False, "ds18b20_resolution": 9, "hd38_enabled": True}
+        write_soak_config(config_path, one_wire_dir, boards, speedup, **variant)
+        reloads = 0
+
+        history = HistoryStore(os.path.join(work_dir, 'history.db'))
+        station = Station(config_path, history, echo=False)
+
+        started = time.monotonic()
+        end = started + hours * 3600
+        next_sample = started + warmup
+        next_reload = started + reload_interval if reload_interval else float('inf')
+        previous = take_sample(started, 0)
+        baseline = None
+        baseline_snapshot = None
+        payloads = 0
+        checked = 0
+        passed = True
+
+        print(f"--- Soak test: {hours}h at {speedup}x speed, sampling every {sample_interval}s ---")
+        station.reload()
+        try:
+            while time.monotonic() < end:
+                station.check_config()
+                payloads += len(station.process(0.5))
+
+                now = time.monotonic()
+                if now >= next_reload:
+                    change = RELOAD_CHANGES[reloads % len(RELOAD_CHANGES)]
+                    if change == "retime":
+                        variant["dht11_slow"] = not variant["dht11_slow"]
+                    elif change == "restart":
+                        variant["ds18b20_resolution"] = 10 if variant["ds18b20_resolution"] == 9 else 9
+                    else:
+                        variant["hd38_enabled"] = not variant["hd38_enabled"]
+                    write_soak_config(config_path, one_wire_dir, boards, speedup, **variant)
+                    reloads += 1
+                    next_reload = now + reload_interval
+
+                if now < next_sample:
+                    continue
+                next_sample = now + sample_interval
+
+                sample = take_sample(started, payloads)
+                if baseline is None:
+                    baseline = sample
+                    baseline_snapshot = take_snapshot()
+                    print(format_sample(sample, None, previous) + " (baseline)")
+                else:
+                    print(format_sample(sample, baseline, previous))
+                    print(format_top_allocators(baseline_snapshot))
+                    violations = check_budgets(baseline, previous, sample, budgets)
+                    checked += 1
+                    if violations:
+                        print("\n❌ Soak test failed:")
+                        for violation in violations:
+                            print(f"   - {violation}")
+                        passed = False
+                        break
+                previous = sample
+        except KeyboardInterrupt:
+            print("\n🛑 Soak test stopped by user.")
+        finally:
+            station.close()
+            history.close()
+            for board in boards:
+                board.stop()
+
+        if baseline_snapshot is not None:
+            print_top_allocators(baseline_snapshot)
+        tracemalloc.stop()
+
+    if passed and not checked:
+        print("\n❌ Soak test ended before any sample was checked against the baseline; "
+              "run it for longer than the warm-up plus one sample interval")
+        passed = False
+    if passed:
+        print(f"\n✅ Soak test passed: {payloads} payloads within budget over {checked} samples")
+    return passed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the station on simulated sensors and "
+                                                 "check CPU, memory, fd and thread growth")
+    parser.add_argument("--hours", type=float, default=DEFAULT_HOURS)
+    parser.add_argument("--speedup", type=float, default=DEFAULT_SPEEDUP)
+    parser.add_argument("--sample-interval", type=float, default=SAMPLE_INTERVAL)
+    parser.add_argument("--warmup", type=float, default=WARMUP)
+    parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL)
+    parser.add_argument("--probes", type=int, default=simulated.SIMULATED_PROBES)
+    parser.add_argument("--boards", type=int, default=simulated.SIMULATED_BOARDS)
+    parser.add_argument("--max-rss-growth", type=float, default=DEFAULT_BUDGETS["rss_mb"],
+                        help="MB")
+    parser.add_argument("--max-heap-growth", type=float, default=DEFAULT_BUDGETS["traced_mb"],
+                        help="MB, as traced by tracemalloc")
+    parser.add_argument("--max-fd-growth", type=int, default=DEFAULT_BUDGETS["fds"])
+    parser.add_argument("--max-thread-growth", type=int, default=DEFAULT_BUDGETS["threads"])
+    parser.add_argument("--max-cpu", type=float, default=DEFAULT_BUDGETS["cpu_percent"],
+                        help="Percent of one core over a sample window")
+    args = parser.parse_args()
+    if args.hours * 3600 <= args.warmup + args.sample_interval:
+        parser.error(f"--hours must be longer than --warmup plus --sample-interval "
+                     f"({args.warmup + args.sample_interval:.0f}s) to check any budget")
+
+    budgets = {
+        "rss_mb": args.max_rss_growth,
+        "traced_mb": args.max_heap_growth,
+        "fds": args.max_fd_growth,
+        "threads": args.max_thread_growth,
+        "cpu_percent": args.max_cpu,
+    }
+    passed = run_soak(args.hours, args.speedup, budgets, args.sample_interval, args.warmup,
+                      args.reload_interval, args.probes, args.boards)
+    sys.exit(0 if passed else 1)